@@ -5,6 +5,7 @@ Research Assistant Agent Configuration
 LangChain agent with ReAct reasoning and tool integration
 """
 
+from collections import deque
 from typing import List, Callable, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
@@ -20,39 +21,50 @@ load_dotenv()
 # Ensure logs directory exists
 os.makedirs('logs', exist_ok=True)
 
+# Debug runs (RA_DEBUG=1) also echo logs to the console and trace executor steps
+DEBUG = bool(int(os.getenv("RA_DEBUG", "0")))
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/agent.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.FileHandler('logs/agent.log')] + ([logging.StreamHandler()] if DEBUG else [])
 )
 logger = logging.getLogger(__name__)
 
+# Number of recent query/response turns kept in chat history
+CHAT_HISTORY_WINDOW = 4
+
 
 class ResearchAgent:
     """
     LangChain-based research assistant agent with tool integration
     """
     
-    def __init__(self, tools: List, callback_handler: Optional[Callable] = None):
+    def __init__(self, tools: List, callback_handler: Optional[Callable] = None,
+                 debug: bool = DEBUG):
         """
         Initialize the research agent
         
         Args:
             tools: List of LangChain tools
             callback_handler: Optional callback for streaming responses
+            debug: Print executor steps and keep intermediate steps (defaults to RA_DEBUG)
         """
         self.tools = tools
         self.callback_handler = callback_handler
-        self.chat_history = []  # Manual chat history management
+        self.debug = debug
+        
+        # Manual chat history management, windowed to the last few turns
+        self.chat_history = deque(maxlen=CHAT_HISTORY_WINDOW)
         
         # Initialize LLM with streaming support
+        # Low temperature + capped output keeps each ReAct step short
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-2.0-flash-exp",
-            temperature=0.7,
+            temperature=0.2,
+            top_p=0.9,
+            max_output_tokens=512,
             streaming=True,
             callbacks=[callback_handler] if callback_handler else None
         )
@@ -85,8 +97,9 @@ Thought: {agent_scratchpad}"""
         )
         
         # Create the ReAct agent
+        # Stop before the model writes its own Observation - the tool supplies it
         self.agent = create_agent(
-            llm=self.llm,
+            llm=self.llm.bind(stop=["\nObservation:"]),
             tools=self.tools,
             prompt=self.prompt
         )
@@ -95,10 +108,10 @@ Thought: {agent_scratchpad}"""
         self.agent_executor = AgentExecutor(
             agent=self.agent,
             tools=self.tools,
-            verbose=True,
+            verbose=debug,
             handle_parsing_errors=True,
             max_iterations=10,
-            return_intermediate_steps=True
+            return_intermediate_steps=debug
         )
         
         logger.info("Research agent initialized successfully")
@@ -111,30 +124,55 @@ Thought: {agent_scratchpad}"""
             query: User's research question
             
         Returns:
-            dict with 'output' and 'intermediate_steps'
+            dict with 'output' (and 'intermediate_steps' in debug mode)
         """
         try:
             logger.info(f"Processing query: {query}")
             
             # Execute the agent
             result = self.agent_executor.invoke({"input": query})
+            return self._record_result(query, result)
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def arun(self, query: str) -> dict:
+        """
+        Execute the agent with a query on the running event loop
+        
+        Args:
+            query: User's research question
             
-            # Store in chat history
-            self.chat_history.append({
-                "query": query,
-                "response": result.get("output", "")
-            })
+        Returns:
+            dict with 'output' (and 'intermediate_steps' in debug mode)
+        """
+        try:
+            logger.info(f"Processing query: {query}")
             
-            logger.info(f"Query completed successfully")
-            return result
+            # Execute the agent; tools with a coroutine run without blocking the loop
+            result = await self.agent_executor.ainvoke({"input": query})
+            return self._record_result(query, result)
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}", exc_info=True)
-            return {
-                "output": f"I encountered an error: {str(e)}",
-                "intermediate_steps": []
-            }
+            return self._error_result(e)
+    
+    def _record_result(self, query: str, result: dict) -> dict:
+        """Store a completed query in chat history and return its result"""
+        self.chat_history.append({
+            "query": query,
+            "response": result.get("output", "")
+        })
+        
+        logger.info(f"Query completed successfully")
+        return result
+    
+    def _error_result(self, error: Exception) -> dict:
+        """Log a failed query and build the result returned in its place"""
+        logger.error(f"Error processing query: {str(error)}", exc_info=True)
+        return {
+            "output": f"I encountered an error: {str(error)}",
+            "intermediate_steps": []
+        }
     
     def clear_memory(self):
         """Clear conversation history"""
-        self.chat_history = []
+        self.chat_history.clear()
         logger.info("Memory cleared")
@@ -5,24 +5,135 @@ PyQt6 GUI for Research Assistant
 Dual-panel interface: Chat + Agent Thinking Logs
 """
 
+import asyncio
 import sys
+from collections import deque
+from functools import cache
+from itertools import groupby
+from operator import itemgetter
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QTextEdit, QLineEdit, QPushButton, QSplitter, QLabel, QMessageBox
+    QPlainTextEdit, QListView, QLineEdit, QPushButton, QSplitter, QLabel, QMessageBox
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QFont, QTextCursor
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+)
+from PyQt6.QtGui import QColor, QFont
 from langchain.callbacks.base import BaseCallbackHandler
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Oldest lines are dropped past this many blocks so long sessions stay responsive
+CHAT_MAX_BLOCKS = 2000
+LOG_MAX_LINES = 10000
+# Streamed tokens and log lines are coalesced and drawn at most this often (~30 fps)
+LOG_FLUSH_INTERVAL_MS = 32
+# Tool output shown in the log is cut to this many characters
+TOOL_OUTPUT_PREVIEW_CHARS = 200
+
+
+@cache
+def _font(family: str, size: int, bold: bool = False) -> QFont:
+    """Shared QFont instance; first called once QApplication exists"""
+    if bold:
+        return QFont(family, size, QFont.Weight.Bold)
+    return QFont(family, size)
 
-class StreamingCallbackHandler(BaseCallbackHandler):
-    """Callback handler for streaming agent responses to GUI"""
+
+class LogListModel(QAbstractListModel):
+    """One row per log line, backed by a bounded deque
+    
+    The view only calls data() for rows it draws, so appending stays cheap
+    no matter how long the log gets.
+    """
+    
+    def __init__(self, max_lines: int = LOG_MAX_LINES, parent=None):
+        super().__init__(parent)
+        self._rows = deque(maxlen=max_lines)  # [color, text] per line
+        self._open = False  # Last row is still waiting for its newline
+        self._colors = {}  # color string -> QColor, built on first use
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        color, text = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return text
+        if role == Qt.ItemDataRole.ForegroundRole and color is not None:
+            qcolor = self._colors.get(color)
+            if qcolor is None:
+                qcolor = self._colors[color] = QColor(color)
+            return qcolor
+        return None
+    
+    def append_text(self, color, text: str):
+        """Append text, splitting it into rows on newlines
+        
+        A color of None continues in the color of the last row.
+        """
+        if color is None and self._rows:
+            color = self._rows[-1][0]
+        
+        for i, line in enumerate(text.split("\n")):
+            if i:
+                # Newline ends the current line; with none open it is a blank row
+                if not self._open:
+                    self._add_row(color, "")
+                self._open = False
+            if not line:
+                continue
+            if self._open and self._rows[-1][0] == color:
+                self._rows[-1][1] += line
+                last = self.index(len(self._rows) - 1)
+                self.dataChanged.emit(last, last)
+            else:
+                self._add_row(color, line)
+                self._open = True
+    
+    def _add_row(self, color, text: str):
+        """Append one row, evicting the oldest when the deque is full"""
+        if len(self._rows) == self._rows.maxlen:
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self._rows.popleft()
+            self.endRemoveRows()
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.append([color, text])
+        self.endInsertRows()
+    
+    def clear(self):
+        """Remove all rows"""
+        self.beginResetModel()
+        self._rows.clear()
+        self._open = False
+        self.endResetModel()
+
+
+class StreamingCallbackHandler(QObject, BaseCallbackHandler):
+    """Callback handler for streaming agent responses to GUI
+    
+    LangChain calls these methods on the worker thread, so nothing here
+    touches a widget; events are emitted as signals and queued onto the
+    GUI thread.
+    """
+    
+    tokenReady = pyqtSignal(str)
+    logReady = pyqtSignal(str, str)  # text, color
+    
+    # Emitting a signal is thread-safe, so under ainvoke call the handler on
+    # the event loop instead of hopping to an executor thread per token
+    run_inline = True
+    
+    def __init__(self):
+        super().__init__()
+        self.current_thought = ""
     
-    def __init__(self, text_widget):
-        self.text_widget = text_widget
+    def reset(self):
+        """Clear per-query state so the handler can be reused"""
         self.current_thought = ""
     
     def on_llm_start(self, serialized, prompts, **kwargs):
@@ -31,8 +142,7 @@ class StreamingCallbackHandler(BaseCallbackHandler):
     
     def on_llm_new_token(self, token: str, **kwargs):
         """Called when new token is generated"""
-        self.text_widget.insertPlainText(token)
-        self.text_widget.ensureCursorVisible()
+        self.tokenReady.emit(token)
     
     def on_llm_end(self, response, **kwargs):
         """Called when LLM finishes"""
@@ -46,37 +156,36 @@ class StreamingCallbackHandler(BaseCallbackHandler):
     
     def on_tool_end(self, output: str, **kwargs):
         """Called when tool finishes"""
-        self.append_log(f"   Output: {output[:200]}...\n" if len(output) > 200 else f"   Output: {output}\n", 
-                       color="#009900")
+        if len(output) > TOOL_OUTPUT_PREVIEW_CHARS:
+            snippet = output[:TOOL_OUTPUT_PREVIEW_CHARS] + "..."
+        else:
+            snippet = output
+        self.append_log(f"   Output: {snippet}\n", color="#009900")
     
     def on_agent_action(self, action, **kwargs):
         """Called when agent takes action"""
         self.append_log(f"\n💭 Thinking: {action.log}\n", color="#9900cc")
     
     def append_log(self, text: str, color: str = "#000000"):
-        """Append colored text to log widget"""
-        cursor = self.text_widget.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        self.text_widget.setTextCursor(cursor)
-        self.text_widget.insertHtml(f'<span style="color:{color}">{text}</span>')
-        self.text_widget.ensureCursorVisible()
+        """Send colored log text to the GUI thread"""
+        self.logReady.emit(text, color)
 
 
-class AgentWorker(QThread):
-    """Worker thread for running agent queries"""
+class AgentWorker(QObject):
+    """Worker for running agent queries, moved onto one long-lived thread"""
     
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
     
-    def __init__(self, agent, query):
+    def __init__(self, agent):
         super().__init__()
         self.agent = agent
-        self.query = query
     
-    def run(self):
+    @pyqtSlot(str)
+    def run_query(self, query: str):
         """Execute agent query in background thread"""
         try:
-            result = self.agent.run(self.query)
+            result = asyncio.run(self.agent.arun(query))
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
@@ -85,10 +194,12 @@ class AgentWorker(QThread):
 class ResearchAssistantGUI(QMainWindow):
     """Main GUI window for research assistant"""
     
+    queryRequested = pyqtSignal(str)
+    
     def __init__(self, agent):
         super().__init__()
         self.agent = agent
-        self.worker = None
+        self._pending_log = []  # (color, text) entries waiting for the next flush
         self.init_ui()
     
     def init_ui(self):
@@ -103,7 +214,7 @@ class ResearchAssistantGUI(QMainWindow):
         
         # Create title
         title = QLabel("🔍 AI Research Assistant")
-        title.setFont(QFont("Arial", 18, QFont.Weight.Bold))
+        title.setFont(_font("Arial", 18, bold=True))
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         main_layout.addWidget(title)
         
@@ -126,6 +237,26 @@ class ResearchAssistantGUI(QMainWindow):
         # Status bar
         self.statusBar().showMessage("Ready")
         
+        # Streamed tokens and log lines are drawn in batches on each tick
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush_log)
+        
+        # One streaming handler is attached to the LLM and reused for every query
+        self.callback = StreamingCallbackHandler()
+        self.callback.tokenReady.connect(self.append_token)
+        self.callback.logReady.connect(self.append_log)
+        self.agent.llm.callbacks = [self.callback]
+        
+        # Agent queries run on a single background thread for the window's lifetime
+        self.agent_thread = QThread(self)
+        self.worker = AgentWorker(self.agent)
+        self.worker.moveToThread(self.agent_thread)
+        self.queryRequested.connect(self.worker.run_query)
+        self.worker.finished.connect(self.on_agent_finished)
+        self.worker.error.connect(self.on_agent_error)
+        self.agent_thread.start()
+        
         logger.info("GUI initialized")
     
     def create_chat_panel(self):
@@ -135,13 +266,14 @@ class ResearchAssistantGUI(QMainWindow):
         
         # Chat title
         chat_label = QLabel("💬 Conversation")
-        chat_label.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+        chat_label.setFont(_font("Arial", 12, bold=True))
         layout.addWidget(chat_label)
         
         # Chat history display
-        self.chat_display = QTextEdit()
+        self.chat_display = QPlainTextEdit()
         self.chat_display.setReadOnly(True)
-        self.chat_display.setFont(QFont("Consolas", 10))
+        self.chat_display.setMaximumBlockCount(CHAT_MAX_BLOCKS)
+        self.chat_display.setFont(_font("Consolas", 10))
         layout.addWidget(self.chat_display)
         
         # Input area
@@ -149,12 +281,11 @@ class ResearchAssistantGUI(QMainWindow):
         
         self.input_field = QLineEdit()
         self.input_field.setPlaceholderText("Ask me anything... (Press Enter to send)")
-        self.input_field.setFont(QFont("Arial", 11))
         self.input_field.returnPressed.connect(self.send_message)
         input_layout.addWidget(self.input_field)
         
         self.send_button = QPushButton("Send")
-        self.send_button.setFont(QFont("Arial", 11, QFont.Weight.Bold))
+        self.send_button.setFont(_font("Arial", 11, bold=True))
         self.send_button.clicked.connect(self.send_message)
         input_layout.addWidget(self.send_button)
         
@@ -173,18 +304,25 @@ class ResearchAssistantGUI(QMainWindow):
         
         # Log title
         log_label = QLabel("🧠 Agent Thinking Process")
-        log_label.setFont(QFont("Arial", 12, QFont.Weight.Bold))
+        log_label.setFont(_font("Arial", 12, bold=True))
         layout.addWidget(log_label)
         
         # Log display
-        self.log_display = QTextEdit()
-        self.log_display.setReadOnly(True)
-        self.log_display.setFont(QFont("Consolas", 9))
+        self.log_model = LogListModel(parent=self)
+        self.log_display = QListView()
+        self.log_display.setModel(self.log_model)
+        # Long tool outputs and thoughts wrap instead of being elided; rows are
+        # laid out in batches so a long log doesn't block the GUI thread
+        self.log_display.setWordWrap(True)
+        self.log_display.setTextElideMode(Qt.TextElideMode.ElideNone)
+        self.log_display.setResizeMode(QListView.ResizeMode.Adjust)
+        self.log_display.setLayoutMode(QListView.LayoutMode.Batched)
+        self.log_display.setFont(_font("Consolas", 9))
         layout.addWidget(self.log_display)
         
         # Clear logs button
         clear_log_button = QPushButton("Clear Logs")
-        clear_log_button.clicked.connect(lambda: self.log_display.clear())
+        clear_log_button.clicked.connect(self.log_model.clear)
         layout.addWidget(clear_log_button)
         
         return panel
@@ -206,17 +344,14 @@ class ResearchAssistantGUI(QMainWindow):
         self.input_field.clear()
         
         # Clear previous logs
-        self.log_display.clear()
+        self.log_model.clear()
         
-        # Create callback handler for streaming
-        callback = StreamingCallbackHandler(self.log_display)
-        self.agent.llm.callbacks = [callback]
+        # Reset streaming state left over from the previous query
+        self._pending_log.clear()
+        self.callback.reset()
         
         # Run agent in background thread
-        self.worker = AgentWorker(self.agent, query)
-        self.worker.finished.connect(self.on_agent_finished)
-        self.worker.error.connect(self.on_agent_error)
-        self.worker.start()
+        self.queryRequested.emit(query)
     
     def on_agent_finished(self, result):
         """Handle agent completion"""
@@ -245,22 +380,74 @@ class ResearchAssistantGUI(QMainWindow):
         QMessageBox.critical(self, "Error", f"An error occurred:\n{error_msg}")
         logger.error(f"Agent error: {error_msg}")
     
+    def closeEvent(self, event):
+        """Stop the agent thread before the window goes away"""
+        self.agent_thread.quit()
+        self.agent_thread.wait()
+        super().closeEvent(event)
+    
+    def append_token(self, token: str):
+        """Queue a streamed token, drawn in the preceding color"""
+        self._queue_log(None, token)
+    
+    def append_log(self, text: str, color: str = "#000000"):
+        """Queue colored text for the log display"""
+        self._queue_log(color, text)
+    
+    def _queue_log(self, color, text: str):
+        """Buffer a (color, text) entry until the next batched flush"""
+        self._pending_log.append((color, text))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+    
+    def flush_log(self):
+        """Insert pending log text with one insert per run of the same color"""
+        if not self._pending_log:
+            self._flush_timer.stop()
+            return
+        runs = [
+            (color, "".join(text for _, text in entries))
+            for color, entries in groupby(self._pending_log, key=itemgetter(0))
+        ]
+        self._pending_log.clear()
+        
+        scrollbar = self.log_display.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        
+        # One repaint for the whole burst
+        self.log_display.setUpdatesEnabled(False)
+        try:
+            for color, text in runs:
+                self.log_model.append_text(color, text)
+        finally:
+            self.log_display.setUpdatesEnabled(True)
+        
+        if at_bottom:
+            # Runs the pending row layout first, so the new rows are reached
+            self.log_display.scrollToBottom()
+    
     def append_chat(self, text: str, color: str = "#000000"):
         """Append message to chat display"""
-        self.chat_display.append(f'<span style="color:{color}">{text}</span>')
+        self.chat_display.appendHtml(f'<span style="color:{color}">{text}</span>')
         self.chat_display.ensureCursorVisible()
     
     def clear_chat(self):
-        """Clear chat history and agent memory"""
-        reply = QMessageBox.question(
-            self, "Clear Chat",
+        """Ask to clear chat history without blocking the event loop"""
+        box = QMessageBox(
+            QMessageBox.Icon.Question, "Clear Chat",
             "Are you sure you want to clear the conversation history?",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            self
         )
-        
-        if reply == QMessageBox.StandardButton.Yes:
+        box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        box.finished.connect(self._on_clear_confirm)
+        box.open()  # Window-modal, but streaming and worker signals keep flowing
+    
+    def _on_clear_confirm(self, result: int):
+        """Clear chat history and agent memory once the user confirms"""
+        if result == QMessageBox.StandardButton.Yes.value:
             self.chat_display.clear()
-            self.log_display.clear()
+            self.log_model.clear()
             self.agent.clear_memory()
             self.statusBar().showMessage("Chat cleared")
             logger.info("Chat and memory cleared")
@@ -270,6 +457,7 @@ def launch_gui(agent):
     """Launch the GUI application"""
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # Modern look
+    app.setFont(_font("Arial", 11))  # Default for widgets without their own font
     
     window = ResearchAssistantGUI(agent)
     window.show()
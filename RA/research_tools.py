@@ -5,41 +5,126 @@ Research Assistant Tools Module
 Provides web search, Wikipedia, file operations, and calculator tools
 """
 
+from functools import cache, lru_cache
 from typing import Optional
-from langchain.tools import BaseTool
+from langchain.tools import Tool
 from langchain_community.utilities import DuckDuckGoSearchAPIWrapper, WikipediaAPIWrapper
+import ast
+import asyncio
+import operator
 import os
 import re
+import string
+
+# Characters allowed through to the calculator's parser
+_CALC_RE = re.compile(r'[^0-9+\-*/().\s]')
+# str.isspace matches \s, which also covers the \x1c-\x1f separators
+_CALC_KEEP = frozenset(string.digits + "+-*/()." + "".join(chr(c) for c in range(128) if chr(c).isspace()))
+# Deletes every other ASCII character in one C-level pass
+_CALC_TRANS = str.maketrans('', '', ''.join(chr(c) for c in range(128) if chr(c) not in _CALC_KEEP))
+
+# Arithmetic the calculator will evaluate; anything else in the AST is rejected
+_CALC_BINOPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+}
+_CALC_UNARYOPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+# Integer powers whose result would exceed this many bits are rejected, so
+# inputs like 2**999999 or nested ((9**99)**99)**99 cannot stall the agent
+CALC_MAX_POW_BITS = 4096
+
+
+def _eval_arithmetic(node):
+    """Evaluate a parsed arithmetic expression node"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+        base = _eval_arithmetic(node.left)
+        exponent = _eval_arithmetic(node.right)
+        # Float powers overflow quickly on their own; only big-int results can run away
+        if type(base) is int and type(exponent) is int:
+            if abs(base).bit_length() * abs(exponent) > CALC_MAX_POW_BITS:
+                raise ValueError(f"Power result would exceed {CALC_MAX_POW_BITS} bits")
+        return operator.pow(base, exponent)
+    if isinstance(node, ast.BinOp) and type(node.op) in _CALC_BINOPS:
+        return _CALC_BINOPS[type(node.op)](_eval_arithmetic(node.left), _eval_arithmetic(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _CALC_UNARYOPS:
+        return _CALC_UNARYOPS[type(node.op)](_eval_arithmetic(node.operand))
+    raise ValueError(f"Unsupported expression element: {type(getattr(node, 'op', node)).__name__}")
+
+
+# Re-plans and self-corrections often repeat a lookup; keep recent results
+SEARCH_CACHE_SIZE = 256
+
+# Files larger than this are truncated before being handed to the agent
+FILE_READ_MAX_BYTES = 256 * 1024
+
+
+@cache
+def _web_search_api() -> DuckDuckGoSearchAPIWrapper:
+    """Process-wide DuckDuckGo wrapper, built on first use"""
+    return DuckDuckGoSearchAPIWrapper(max_results=5)
+
+
+@cache
+def _wikipedia_api() -> WikipediaAPIWrapper:
+    """Process-wide Wikipedia wrapper, built on first use"""
+    return WikipediaAPIWrapper(top_k_results=2, doc_content_chars_max=500)
+
+
+@lru_cache(maxsize=SEARCH_CACHE_SIZE)
+def _web_search(query: str) -> str:
+    """Run a DuckDuckGo search for an already normalized query"""
+    return _web_search_api().run(query)
+
+
+@lru_cache(maxsize=SEARCH_CACHE_SIZE)
+def _wikipedia_lookup(query: str) -> str:
+    """Fetch Wikipedia summaries for an already normalized query"""
+    return _wikipedia_api().run(query)
+
+
+def _normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive cache key for a lookup"""
+    return " ".join(query.split()).lower()
 
 
 class WebSearchTool:
     """Web search using DuckDuckGo"""
     
-    def __init__(self):
-        self.search = DuckDuckGoSearchAPIWrapper(max_results=5)
-    
     def run(self, query: str) -> str:
         """Execute web search"""
         try:
-            results = self.search.run(query)
+            results = _web_search(_normalize_query(query))
             return f"Web Search Results for '{query}':\n{results}"
         except Exception as e:
             return f"Error performing web search: {str(e)}"
+    
+    async def arun(self, query: str) -> str:
+        """Execute web search without blocking the event loop"""
+        return await asyncio.to_thread(self.run, query)
 
 
 class WikipediaTool:
     """Wikipedia article lookup"""
     
-    def __init__(self):
-        self.wikipedia = WikipediaAPIWrapper(top_k_results=2, doc_content_chars_max=500)
-    
     def run(self, query: str) -> str:
         """Fetch Wikipedia summary"""
         try:
-            results = self.wikipedia.run(query)
+            results = _wikipedia_lookup(_normalize_query(query))
             return f"Wikipedia Summary for '{query}':\n{results}"
         except Exception as e:
             return f"Error fetching Wikipedia article: {str(e)}"
+    
+    async def arun(self, query: str) -> str:
+        """Fetch Wikipedia summary without blocking the event loop"""
+        return await asyncio.to_thread(self.run, query)
 
 
 class FileReadTool:
@@ -51,10 +136,13 @@ class FileReadTool:
             if not os.path.exists(filepath):
                 return f"Error: File '{filepath}' does not exist"
             
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+            size = os.path.getsize(filepath)
+            with open(filepath, 'rb') as f:
+                content = f.read(FILE_READ_MAX_BYTES).decode('utf-8', errors='replace')
             
-            return f"File content from '{filepath}':\n{content}"
+            if size > FILE_READ_MAX_BYTES:
+                return f"File content from '{filepath}':\n" + content + f"\n...[truncated, total {size} bytes]"
+            return f"File content from '{filepath}':\n" + content
         except Exception as e:
             return f"Error reading file: {str(e)}"
 
@@ -75,10 +163,18 @@ class FileWriteTool:
             filepath = filepath.strip()
             
             # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+            parent = os.path.dirname(filepath)
+            if parent and not os.path.isdir(parent):
+                os.makedirs(parent, exist_ok=True)
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # One-shot write of the encoded bytes, skipping the buffered text layer
+            data = memoryview(content.encode('utf-8'))
+            fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
             
             return f"Successfully wrote {len(content)} characters to '{filepath}'"
         except Exception as e:
@@ -92,12 +188,14 @@ class CalculatorTool:
         """Evaluate mathematical expression"""
         try:
             # Remove any non-mathematical characters for safety
-            cleaned = re.sub(r'[^0-9+\-*/().\s]', '', expression)
+            cleaned = expression.translate(_CALC_TRANS)
+            if not cleaned.isascii():
+                cleaned = _CALC_RE.sub('', cleaned)  # Rare: strip non-ASCII leftovers
             
-            if not cleaned:
+            if not cleaned.strip():
                 return "Error: Invalid mathematical expression"
             
-            result = eval(cleaned, {"__builtins__": {}}, {})
+            result = _eval_arithmetic(ast.parse(cleaned.strip(), mode='eval').body)
             return f"Calculation: {expression} = {result}"
         except Exception as e:
             return f"Error evaluating expression: {str(e)}"
@@ -113,30 +211,32 @@ def create_tools():
     calculator = CalculatorTool()
     
     tools = [
-        BaseTool(
+        Tool(
             name="web_search",
             func=web_search.run,
+            coroutine=web_search.arun,
             description="Useful for searching the internet for current information, news, articles, and general knowledge. Input should be a search query string."
         ),
-        BaseTool(
+        Tool(
             name="wikipedia",
             func=wikipedia.run,
+            coroutine=wikipedia.arun,
             description="Useful for getting detailed information from Wikipedia about historical facts, concepts, people, places, and events. Input should be a topic name or question."
         ),
-        BaseTool(
+        Tool(
             name="read_file",
             func=file_read.run,
             description="Reads the contents of a text file. Input should be the complete file path as a string."
         ),
-        BaseTool(
+        Tool(
             name="write_file",
             func=file_write.run,
             description="Writes content to a text file. Input format: 'filepath|content' where filepath is the destination and content is what to write."
         ),
-        BaseTool(
+        Tool(
             name="calculator",
             func=calculator.run,
-            description="Evaluates mathematical expressions. Supports basic operations (+, -, *, /, parentheses). Input should be a mathematical expression like '2 + 2' or '(10 * 5) / 2'."
+            description="Evaluates mathematical expressions. Supports basic operations (+, -, *, /, ** with results up to about 1200 digits, parentheses). Input should be a mathematical expression like '2 + 2' or '(10 * 5) / 2'."
         ),
     ]
     
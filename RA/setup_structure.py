@@ -1,31 +1,34 @@
 # Copyright (c) 2025
 # Licensed under the MIT License
 
-import os
+from pathlib import Path
 
-# Create directory structure for research assistant
-base_dir = r"c:\Users\SaadG\Desktop\Projects\Python\Agents\Agentic_Designs.worktrees\worktree-2025-12-13T03-45-20\research_assistant"
+# Create directory structure for research assistant next to this script
+base_dir = Path(__file__).resolve().parent / "research_assistant"
 
+# Leaf directories only; parents=True creates base_dir along the way
 directories = [
-    base_dir,
-    os.path.join(base_dir, "tools"),
-    os.path.join(base_dir, "gui"),
-    os.path.join(base_dir, "logs"),
+    base_dir / "tools",
+    base_dir / "gui",
+    base_dir / "logs",
 ]
 
 for directory in directories:
-    os.makedirs(directory, exist_ok=True)
+    directory.mkdir(parents=True, exist_ok=True)
     print(f"Created: {directory}")
 
-# Create __init__.py files
+# Create __init__.py files, leaving existing ones untouched
 init_files = [
-    os.path.join(base_dir, "tools", "__init__.py"),
-    os.path.join(base_dir, "gui", "__init__.py"),
+    base_dir / "tools" / "__init__.py",
+    base_dir / "gui" / "__init__.py",
 ]
 
 for init_file in init_files:
-    with open(init_file, 'w') as f:
-        f.write("# Package initialization\n")
-    print(f"Created: {init_file}")
+    try:
+        with open(init_file, 'x') as f:
+            f.write("# Package initialization\n")
+        print(f"Created: {init_file}")
+    except FileExistsError:
+        print(f"Exists: {init_file}")
 
 print("\nDirectory structure created successfully!")
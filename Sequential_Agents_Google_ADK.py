@@ -20,33 +20,90 @@ Google Trends Categories:
 """
 
 import asyncio
+import hashlib
 import json
 import logging
 import os
-from typing import AsyncGenerator
+import re
+import reprlib
+import sys
+import time
+from collections import deque
+from functools import cache
+from typing import AsyncGenerator, Optional
 from datetime import datetime
 from pathlib import Path
 
 from dotenv import load_dotenv
-from google.adk.agents import SequentialAgent, LlmAgent, BaseAgent
+from google.adk.agents import SequentialAgent, ParallelAgent, LlmAgent, BaseAgent
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.agents.invocation_context import InvocationContext
-from google.adk.events import Event
+from google.adk.events import Event, EventActions
+from google.adk.models import LlmRequest, LlmResponse
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
+try:
+    import orjson  # Optional: C-level JSON encoder for the run logs
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: offline Gemini tokenizer (needs sentencepiece)
+    from google.genai.local_tokenizer import LocalTokenizer
+except ImportError:
+    LocalTokenizer = None
+
+try:
+    import pytrends
+except ImportError:
+    pytrends = None
+
 load_dotenv()
 
 # ============================================================================
 # LOGGING & MONITORING SYSTEM
 # ============================================================================
 
+# Size-bounded formatter for one-line event logs
+_repr = reprlib.Repr()
+_repr.maxstring = 160
+_repr.maxlist = 5
+_repr.maxdict = 5
+_repr.maxother = 200
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """Encode obj to UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(obj, default=str, indent=2 if indent else None).encode("utf-8")
+
+
+def _fast_len(data) -> int:
+    """Approximate size of data for metrics without stringifying it."""
+    if data is None:
+        return 0
+    if isinstance(data, (str, bytes, bytearray, memoryview)):
+        return len(data)
+    if isinstance(data, (list, tuple, dict, set)):
+        return len(data)  # approximate: item count, not bytes
+    return sys.getsizeof(data)
+
+
 class AgentLogger:
     """
     Comprehensive logging system for agent pipeline.
     Tracks all actions, perceptions, and decisions.
     """
     
+    # Minimum seconds between console perception lines
+    PERCEPTION_PRINT_INTERVAL: float = 0.5
+    # Per-list cap on retained perceptions/actions/errors/events (oldest dropped)
+    MAX_EVENTS: int = int(os.getenv("AG1_MAX_EVENTS", "1000"))
+    
     def __init__(self, log_dir: str = "logs"):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
@@ -62,7 +119,7 @@ class AgentLogger:
             "start_time": datetime.now().isoformat(),
             "end_time": None,
             "agents": [],
-            "events": [],
+            "events": deque(maxlen=self.MAX_EVENTS),
             "metrics": {
                 "total_agents": 0,
                 "successful_agents": 0,
@@ -71,6 +128,11 @@ class AgentLogger:
             }
         }
         
+        # Console output (AG1_VERBOSE=0 silences per-agent console lines)
+        self.verbose = bool(int(os.getenv("AG1_VERBOSE", "1")))
+        self._con = sys.stdout
+        self._last_perception_print = 0.0
+        
         # Setup file logger
         self._setup_file_logger()
         
@@ -110,11 +172,11 @@ class AgentLogger:
             "start_time": timestamp,
             "end_time": None,
             "status": "running",
-            "input_data": None,
+            "input_data_len": 0,
             "output_data": None,
-            "perceptions": [],
-            "actions": [],
-            "errors": [],
+            "perceptions": deque(maxlen=self.MAX_EVENTS),
+            "actions": deque(maxlen=self.MAX_EVENTS),
+            "errors": deque(maxlen=self.MAX_EVENTS),
         }
         self.run_data["agents"].append(agent_entry)
         self.run_data["metrics"]["total_agents"] += 1
@@ -122,11 +184,12 @@ class AgentLogger:
         self.file_logger.info(f"[AGENT START] {agent_name}")
         self.file_logger.info(f"  Description: {description}")
         
-        print(f"\n🚀 [{timestamp[11:19]}] Agent Starting: {agent_name}")
+        self._echo(f"\n🚀 [{timestamp[11:19]}] Agent Starting: {agent_name}")
     
     def log_agent_perception(self, agent_name: str, perception_type: str, data: any):
         """Log what data an agent perceives/receives."""
         timestamp = datetime.now().isoformat()
+        data_len = _fast_len(data)
         
         # Find current agent
         for agent in reversed(self.run_data["agents"]):
@@ -134,18 +197,24 @@ class AgentLogger:
                 perception = {
                     "timestamp": timestamp,
                     "type": perception_type,
-                    "data_summary": self._summarize_data(data),
-                    "data_size": len(str(data)) if data else 0,
+                    "data_size": data_len,
                 }
                 agent["perceptions"].append(perception)
-                agent["input_data"] = self._summarize_data(data)
-                self.run_data["metrics"]["total_data_bytes"] += perception["data_size"]
+                agent["input_data_len"] = agent.get("input_data_len", 0) + data_len
+                # Only keep a preview of the first input, not one per perception
+                if "input_data_preview" not in agent:
+                    agent["input_data_preview"] = self._summarize_data(data)
+                self.run_data["metrics"]["total_data_bytes"] += data_len
                 break
         
         self.file_logger.info(f"[PERCEPTION] {agent_name} received {perception_type}")
-        self.file_logger.debug(f"  Data size: {len(str(data)) if data else 0} bytes")
+        self.file_logger.debug(f"  Data size: {data_len} bytes")
         
-        print(f"   👁️ Perceived: {perception_type} ({len(str(data)) if data else 0} bytes)")
+        # Rate-limit perception lines; the file log keeps every one
+        now = time.monotonic()
+        if now - self._last_perception_print >= self.PERCEPTION_PRINT_INTERVAL:
+            self._last_perception_print = now
+            self._echo(f"   👁️ Perceived: {perception_type} ({data_len} bytes)")
     
     def log_agent_action(self, agent_name: str, action: str, details: str = ""):
         """Log an action taken by an agent."""
@@ -165,10 +234,10 @@ class AgentLogger:
         if details:
             self.file_logger.debug(f"  Details: {details[:200]}...")
         
-        print(f"   ⚡ Action: {action}")
+        self._echo(f"   ⚡ Action: {action}")
     
-    def log_agent_output(self, agent_name: str, output: any):
-        """Log the output produced by an agent."""
+    def log_agent_output(self, agent_name: str, output: any, size: int = None):
+        """Log the output produced by an agent; size overrides the measured length."""
         timestamp = datetime.now().isoformat()
         
         for agent in reversed(self.run_data["agents"]):
@@ -176,10 +245,10 @@ class AgentLogger:
                 agent["output_data"] = self._summarize_data(output)
                 break
         
-        output_size = len(str(output)) if output else 0
+        output_size = size if size is not None else _fast_len(output)
         self.file_logger.info(f"[OUTPUT] {agent_name} produced {output_size} bytes")
         
-        print(f"   📤 Output: {output_size} bytes")
+        self._echo(f"   📤 Output: {output_size} bytes")
     
     def log_agent_complete(self, agent_name: str, success: bool = True, error: str = None):
         """Log when an agent completes."""
@@ -196,11 +265,11 @@ class AgentLogger:
         if success:
             self.run_data["metrics"]["successful_agents"] += 1
             self.file_logger.info(f"[AGENT COMPLETE] {agent_name} ✅")
-            print(f"   ✅ Completed successfully")
+            self._echo(f"   ✅ Completed successfully")
         else:
             self.run_data["metrics"]["failed_agents"] += 1
             self.file_logger.error(f"[AGENT FAILED] {agent_name} ❌ - {error}")
-            print(f"   ❌ Failed: {error}")
+            self._echo(f"   ❌ Failed: {error}")
     
     def log_event(self, event_type: str, data: dict):
         """Log a general pipeline event."""
@@ -213,13 +282,30 @@ class AgentLogger:
         }
         self.run_data["events"].append(event)
         
-        self.file_logger.info(f"[EVENT] {event_type}: {json.dumps(data, default=str)[:200]}")
+        self.file_logger.info(f"[EVENT] {event_type}: {_repr.repr(data)}")
+    
+    def _echo(self, text: str):
+        """Write a console line when verbose, without forcing a flush."""
+        if self.verbose:
+            self._con.write(text + "\n")
     
     def _summarize_data(self, data) -> str:
         """Create a summary of data for logging."""
         if data is None:
             return "None"
         
+        # Cheap paths for common types so large payloads aren't fully stringified
+        if isinstance(data, str):
+            if len(data) > 500:
+                return data[:500] + f"... ({len(data)} total chars)"
+            return data
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data[:500]).decode("utf-8", "replace")
+        if isinstance(data, dict):
+            return f"<dict keys={list(data)[:8]}>"
+        if isinstance(data, list):
+            return f"<list len={len(data)} first={data[0] if data else None!r:.120}>"
+        
         data_str = str(data)
         if len(data_str) > 500:
             return data_str[:500] + f"... ({len(data_str)} total chars)"
@@ -235,9 +321,22 @@ class AgentLogger:
         duration = (end - start).total_seconds()
         self.run_data["metrics"]["duration_seconds"] = duration
         
-        # Save JSON log
-        with open(self.json_log_file, "w", encoding="utf-8") as f:
-            json.dump(self.run_data, f, indent=2, default=str)
+        # Save JSON log (bounded deques -> lists for the encoder)
+        export = {
+            **self.run_data,
+            "events": list(self.run_data["events"]),
+            "agents": [
+                {
+                    **a,
+                    "perceptions": list(a["perceptions"]),
+                    "actions": list(a["actions"]),
+                    "errors": list(a["errors"]),
+                }
+                for a in self.run_data["agents"]
+            ],
+        }
+        with open(self.json_log_file, "wb") as f:
+            f.write(_json_dumps(export, indent=True))
         
         self.file_logger.info("="*80)
         self.file_logger.info("PIPELINE RUN COMPLETE")
@@ -245,6 +344,7 @@ class AgentLogger:
         self.file_logger.info(f"Agents: {self.run_data['metrics']['successful_agents']}/{self.run_data['metrics']['total_agents']} successful")
         self.file_logger.info("="*80)
         
+        self._con.flush()
         print(f"\n📊 Run Metrics:")
         print(f"   Duration: {duration:.2f}s")
         print(f"   Agents: {self.run_data['metrics']['successful_agents']}/{self.run_data['metrics']['total_agents']} successful")
@@ -261,10 +361,19 @@ agent_logger: AgentLogger = None
 # ============================================================================
 
 GEMINI_MODEL = "gemini-2.0-flash-exp"
+# Playbook sections are template fill-in, not heavy reasoning - use the
+# faster/cheaper Flash-Lite model for them and keep GEMINI_MODEL for analysis
+INSIGHTS_MODEL = "gemini-2.0-flash-lite"
 APP_NAME = "google_trends_pipeline"
 USER_ID = "trends_analyst"
 SESSION_ID = "session_trends"
 
+# Fixed trigger message - built once and reused for every run
+PIPELINE_TRIGGER_CONTENT = types.Content(
+    role="user",
+    parts=[types.Part(text="Fetch and analyze LIVE Google Trends data for Entertainment, Games, and Shopping.")]
+)
+
 # Google Trends RSS feeds - These contain LIVE data (no JS rendering needed)
 # Using Google Trends Daily Trends API endpoint that returns actual data
 TRENDS_SOURCES = {
@@ -291,6 +400,48 @@ TRENDS_SOURCES = {
     },
 }
 
+# Page chrome that the trend extractors pick up as candidate titles
+_UI_BLOCKLIST = frozenset({"rows per page", "next", "previous", "trending", "explore"})
+
+# Token budget for trends_text_list, which every LLM agent receives as input
+TRENDS_TOKEN_BUDGET = 1000
+
+
+@cache
+def _local_tokenizer():
+    """Load the local Gemini tokenizer once; None if it is unavailable."""
+    if LocalTokenizer is None:
+        return None
+    try:
+        return LocalTokenizer(model_name=INSIGHTS_MODEL)
+    except Exception:
+        return None
+
+
+def _count_tokens(text: str) -> int:
+    """Count Gemini tokens locally, estimating ~4 chars/token without a tokenizer."""
+    tokenizer = _local_tokenizer()
+    if tokenizer is not None:
+        try:
+            return tokenizer.count_tokens(text).total_tokens or 0
+        except Exception:
+            pass
+    return -(-len(text) // 4)
+
+
+def _traffic_sort_key(trend: dict) -> int:
+    """Convert a trend's traffic string (e.g. '200K+') to a number for sorting."""
+    traffic = trend.get("traffic", "0")
+    multipliers = {"M": 1000000, "K": 1000, "B": 1000000000}
+    match = re.match(r'(\d+)([KMB])?', traffic.replace("+", "").replace(",", ""))
+    if match:
+        num = int(match.group(1))
+        suffix = match.group(2)
+        if suffix:
+            num *= multipliers.get(suffix, 1)
+        return num
+    return 0
+
 
 # ============================================================================
 # AGENT 1: Live Data Fetcher (with logging) - SELENIUM VERSION FOR EXACT DATA
@@ -328,9 +479,13 @@ class LiveTrendsFetcher(BaseAgent):
             from selenium.webdriver.common.by import By
             from selenium.webdriver.support.ui import WebDriverWait
             from selenium.webdriver.support import expected_conditions as EC
+            from selenium.common.exceptions import TimeoutException
             from webdriver_manager.chrome import ChromeDriverManager
-            import time
-            import re
+            
+            # Page is ready once trend links are rendered
+            _TREND_READY = EC.presence_of_element_located(
+                (By.CSS_SELECTOR, "a[href*='trends.google.com/trends/explore']")
+            )
             
             agent_logger.log_agent_action(self.name, "Initializing Chrome WebDriver (headless)")
             
@@ -342,6 +497,8 @@ class LiveTrendsFetcher(BaseAgent):
             chrome_options.add_argument("--disable-gpu")
             chrome_options.add_argument("--window-size=1920,1080")
             chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+            # Return from driver.get() at DOMContentLoaded; _TREND_READY waits for the data
+            chrome_options.page_load_strategy = "eager"
             
             print("\n" + "="*70)
             print("📡 FETCHING LIVE GOOGLE TRENDS - COMPREHENSIVE COVERAGE")
@@ -353,6 +510,17 @@ class LiveTrendsFetcher(BaseAgent):
                 options=chrome_options
             )
             
+            # All URLs share one origin and one driver - skip images/fonts the
+            # extractor never reads so each navigation only pays for HTML + JS
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": [
+                    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+                    "*.woff", "*.woff2", "*.ttf",
+                ]})
+            except Exception:
+                pass
+            
             fetched_data = {
                 "fetch_time": datetime.now().isoformat(),
                 "data_source": "selenium_direct",
@@ -361,6 +529,7 @@ class LiveTrendsFetcher(BaseAgent):
                 "timeframes": {},
                 "all_trends_flat": [],  # Flat list for easy LLM access
             }
+            seen_titles = set()  # Titles already in all_trends_flat
             
             # ============================================================
             # URL CONFIGURATIONS - Comprehensive coverage
@@ -430,6 +599,8 @@ class LiveTrendsFetcher(BaseAgent):
                     )
                     for elem in trend_elements[:30]:
                         title = elem.text.strip()
+                        if title.lower() in _UI_BLOCKLIST:
+                            continue
                         if title and len(title) > 1 and len(title) < 100:
                             parent = elem.find_element(By.XPATH, "./../..")
                             parent_text = parent.text
@@ -445,6 +616,8 @@ class LiveTrendsFetcher(BaseAgent):
                     lines = page_text.split('\n')
                     for i, line in enumerate(lines):
                         line = line.strip()
+                        if line.lower() in _UI_BLOCKLIST:
+                            continue
                         if line and len(line) > 2 and len(line) < 100:
                             if i + 1 < len(lines):
                                 next_line = lines[i + 1].strip()
@@ -462,6 +635,8 @@ class LiveTrendsFetcher(BaseAgent):
                                 titles = re.findall(r'"title"\s*:\s*"([^"]+)"', content)
                                 traffics = re.findall(r'"formattedTraffic"\s*:\s*"([^"]+)"', content)
                                 for j, title in enumerate(titles[:20]):
+                                    if title.lower() in _UI_BLOCKLIST:
+                                        continue
                                     if title not in [t['title'] for t in trends]:
                                         traffic = traffics[j] if j < len(traffics) else "N/A"
                                         trends.append({"title": title, "traffic": traffic})
@@ -486,22 +661,16 @@ class LiveTrendsFetcher(BaseAgent):
                 try:
                     driver.get(url)
                     agent_logger.log_agent_action(self.name, f"Waiting for {name} to render")
-                    time.sleep(4)
                     
                     try:
-                        WebDriverWait(driver, 8).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "table"))
-                        )
-                    except:
-                        pass
+                        WebDriverWait(driver, 8, poll_frequency=0.2).until(_TREND_READY)
+                    except TimeoutException:
+                        # No trend links yet - give the page a short settle time
+                        time.sleep(0.5)
                     
                     page_text = driver.find_element(By.TAG_NAME, "body").text
                     trends = extract_trends_from_page(driver, page_text)
                     
-                    # Filter out UI elements
-                    trends = [t for t in trends if t['title'].lower() not in 
-                              ['rows per page', 'next', 'previous', 'trending', 'explore']]
-                    
                     # Store in categories
                     fetched_data["categories"][key] = {
                         "name": name,
@@ -522,8 +691,10 @@ class LiveTrendsFetcher(BaseAgent):
                             "category": category,
                             "timeframe": timeframe,
                         }
-                        if flat_entry["title"] not in [x["title"] for x in fetched_data["all_trends_flat"]]:
-                            fetched_data["all_trends_flat"].append(flat_entry)
+                        if flat_entry["title"] in seen_titles:
+                            continue
+                        seen_titles.add(flat_entry["title"])
+                        fetched_data["all_trends_flat"].append(flat_entry)
                     
                     agent_logger.log_agent_action(
                         self.name,
@@ -551,15 +722,32 @@ class LiveTrendsFetcher(BaseAgent):
             
             # Store data for next agent
             context.session.state["live_trends_data"] = fetched_data
+            # Serialized size, computed once here instead of re-encoding for metrics
+            live_trends_data_bytes = len(_json_dumps(fetched_data))
+            context.session.state["live_trends_data_bytes"] = live_trends_data_bytes
             
-            # Also create a simple text list for the LLM to use
-            trends_text_list = "\n".join([
-                f"- {t['title']} ({t['traffic']}) [{t['category']}]" 
-                for t in fetched_data["all_trends_flat"][:50]
-            ])
+            # Also create a simple text list for the LLM to use, counted once
+            # here and trimmed to the token budget shared by every LLM agent
+            trend_lines = []
+            trends_token_count = 0
+            for t in fetched_data["all_trends_flat"][:50]:
+                line = f"- {t['title']} ({t['traffic']}) [{t['category']}]"
+                line_tokens = _count_tokens(line) + 1  # +1 for the joining newline
+                if trends_token_count + line_tokens > TRENDS_TOKEN_BUDGET:
+                    break
+                trend_lines.append(line)
+                trends_token_count += line_tokens
+            trends_text_list = "\n".join(trend_lines)
             context.session.state["trends_text_list"] = trends_text_list
+            context.session.state["trends_token_count"] = trends_token_count
+            agent_logger.log_agent_action(
+                self.name, f"trends_text_list: {len(trend_lines)} trends, ~{trends_token_count} tokens"
+            )
+            # Content hash of the LLM input - keys the insights cache
+            trends_hash = hashlib.blake2b(trends_text_list.encode("utf-8"), digest_size=16).hexdigest()
+            context.session.state["trends_hash"] = trends_hash
             
-            agent_logger.log_agent_output(self.name, fetched_data)
+            agent_logger.log_agent_output(self.name, fetched_data, size=live_trends_data_bytes)
             agent_logger.log_agent_complete(self.name, success=True)
             
             total_trends = len(fetched_data["all_trends_flat"])
@@ -574,7 +762,16 @@ class LiveTrendsFetcher(BaseAgent):
                 role="model",
                 parts=[types.Part(text=f"✅ Fetched {total_trends} unique live trends from {len(url_configs)} Google Trends sources")]
             )
-            yield Event(author=self.name, content=content)
+            # Publish state through the event so the session service (and the
+            # runner loop's state view) records it
+            actions = EventActions(state_delta={
+                "live_trends_data": fetched_data,
+                "live_trends_data_bytes": live_trends_data_bytes,
+                "trends_text_list": trends_text_list,
+                "trends_hash": trends_hash,
+                "trends_token_count": trends_token_count,
+            })
+            yield Event(author=self.name, content=content, actions=actions)
             
         except ImportError as e:
             error_msg = f"Missing package. Install: pip install selenium webdriver-manager\nError: {e}"
@@ -590,6 +787,37 @@ class LiveTrendsFetcher(BaseAgent):
             yield Event(author=self.name, content=content)
 
 
+# ============================================================================
+# PROMPT ASSEMBLY - static instruction prefix, dynamic data suffix
+# ============================================================================
+# Each LLM agent's instruction is static across runs so providers with prefix
+# caching (implicit on Gemini) can reuse it. Prefix caches match exact prefixes
+# only, so everything that varies per run goes after it, in this order:
+# static role + playbook + policy (instruction), today's date, trend data.
+
+def _today() -> str:
+    """Today's date in prompt form, e.g. 'December 17, 2025'."""
+    now = datetime.now()
+    return f"{now:%B} {now.day}, {now.year}"
+
+
+def _append_trend_data(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Append today's date and the live trend list as the final user message."""
+    trends_text_list = callback_context.state.get("trends_text_list", "")
+    llm_request.contents.append(
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(text=f"TODAY'S DATE: {_today()}"),
+                types.Part(text=f"HERE IS THE ACTUAL TREND DATA (use ONLY these):\n{trends_text_list}"),
+            ],
+        )
+    )
+    return None
+
+
 # ============================================================================
 # AGENT 2: Trend Categorizer (LLM Agent with logging wrapper)
 # ============================================================================
@@ -609,24 +837,19 @@ trend_categorizer = LlmAgent(
     description="Categorizes and organizes the live trends data.",
     instruction="""You are a data organization assistant. Your job is to organize the fetched Google Trends data.
 
-TODAY'S DATE: December 17, 2025
-
-The session state contains:
-- 'live_trends_data': Full structured data with categories
-- 'trends_text_list': Simple text list of all trends
-
-HERE IS THE ACTUAL DATA YOU MUST USE (from trends_text_list):
-{trends_text_list}
+Today's date and the trend data you MUST use are provided in the final user
+message. The trend data is a simple text list of all trends (one per line:
+title, traffic, category).
 
 YOUR TASK:
-1. Read the trends from the list above
+1. Read the trends from the provided trend data
 2. Organize them by category (Entertainment, Games, Shopping, All)
 3. Sort by traffic volume (500K > 200K > 100K > 50K > 20K > 10K > 5K > 2K > 1K)
 
-OUTPUT FORMAT - Return ONLY this JSON using the ACTUAL trends above:
+OUTPUT FORMAT - Return ONLY this JSON using the ACTUAL trends provided:
 ```json
 {
-  "date": "2025-12-17",
+  "date": "YYYY-MM-DD (today's date)",
   "data_freshness": "48h-168h active trends",
   "top_15_by_traffic": [
     {"title": "EXACT NAME FROM LIST", "traffic": "EXACT TRAFFIC", "category": "category"}
@@ -646,8 +869,9 @@ OUTPUT FORMAT - Return ONLY this JSON using the ACTUAL trends above:
 }
 ```
 
-⚠️ CRITICAL: You MUST only use trend names that appear in the data above.
+⚠️ CRITICAL: You MUST only use trend names that appear in the provided trend data.
 Copy names and traffic values EXACTLY as shown. Do NOT invent trends.""",
+    before_model_callback=_append_trend_data,
     output_key="categorized_trends",
 )
 
@@ -666,10 +890,8 @@ trends_analyzer = LlmAgent(
 - E-commerce opportunities
 - Content monetization strategies
 
-TODAY'S DATE: December 17, 2025
-
-HERE IS THE ACTUAL TREND DATA (use ONLY these):
-{trends_text_list}
+Today's date and the trend data to use are provided in the final user message
+(use ONLY those trends).
 
 ═══════════════════════════════════════════════════════════════════════════════
 DELIVER A COMPREHENSIVE TREND INTELLIGENCE REPORT
@@ -748,40 +970,47 @@ For each major trend, what questions should we research further?
 
 (Top 5 trends that need deeper research)
 
-⚠️ CRITICAL: Use ONLY trend names from the data above. No hallucinations.""",
+⚠️ CRITICAL: Use ONLY trend names from the provided trend data. No hallucinations.""",
+    before_model_callback=_append_trend_data,
     output_key="analysis_report",
 )
 
 
 # ============================================================================
-# AGENT 4: Strategic Insights Generator (with logging)
+# AGENT 4: Strategic Insights Generator (parallel sections + assembler)
 # ============================================================================
+# The playbook's seven sections are near-independent, so each is generated by
+# its own small LlmAgent and the sections decode concurrently. Wall-clock is
+# set by the longest section instead of the sum of all seven.
 
-insights_generator = LlmAgent(
-    name="InsightsGenerator",
-    model=GEMINI_MODEL,
-    description="Strategic monetization architect with detailed execution plans.",
-    instruction="""You are a STRATEGIC MONETIZATION ARCHITECT - an expert in:
+# Shared by every section agent so it is an identical, cacheable prefix
+_INSIGHTS_ROLE = """You are a STRATEGIC MONETIZATION ARCHITECT - an expert in:
 - Content marketing & SEO
 - E-commerce & print-on-demand
 - Affiliate marketing
 - Digital product creation
 - Viral content engineering
 
-TODAY'S DATE: December 17, 2025
-
-HERE IS THE ACTUAL TREND DATA (use ONLY these):
-{trends_text_list}
+Today's date and the trend data to use are provided in the final user message
+(use ONLY those trends).
 
 ═══════════════════════════════════════════════════════════════════════════════
 STRATEGIC MONETIZATION PLAYBOOK - DETAILED EXECUTION PLANS
 ═══════════════════════════════════════════════════════════════════════════════
 
-## 🚀 SECTION 1: CONTENT EMPIRE BUILDING
+Write ONLY the playbook section below - the other sections are written separately.
+"""
+
+_INSIGHTS_CRITICAL = "⚠️ CRITICAL: All trend names MUST come from the provided data. No hallucinations."
+
+_INSIGHTS_SECTION_1_HEADER = "## 🚀 SECTION 1: CONTENT EMPIRE BUILDING"
 
-For the TOP 5 highest-traffic trends, provide DETAILED content plans:
+# Section 1 is one content play per top trend; each play is its own request
+# with this shared single-trend template
+_CONTENT_PLAY_TEMPLATE = """Provide a DETAILED content plan for the ONE trend named as YOUR TREND in
+the final user message:
 
-### 📝 CONTENT PLAY #1: [TREND NAME]
+### 📝 CONTENT PLAY #[RANK]: [TREND NAME]
 
 **A. BLOG/WEBSITE STRATEGY**
 ```
@@ -832,13 +1061,9 @@ Thread Structure (10 tweets):
 
 Post Timing: [optimal time]
 Engagement Tactics: Poll, question, quote-tweet strategy
-```
-
-(Repeat for 5 trends)
+```"""
 
----
-
-## 🛍️ SECTION 2: E-COMMERCE & MERCH EXPLOITATION
+_INSIGHTS_SECTION_2 = """## 🛍️ SECTION 2: E-COMMERCE & MERCH EXPLOITATION
 
 For trends with PRODUCT POTENTIAL:
 
@@ -891,11 +1116,9 @@ Content Outline:
   - Bonus: [additional value]
 ```
 
-(Create for 3-4 trends with merch potential)
-
----
+(Create for 3-4 trends with merch potential)"""
 
-## 💰 SECTION 3: AFFILIATE & PARTNERSHIP PLAYS
+_INSIGHTS_SECTION_3 = """## 💰 SECTION 3: AFFILIATE & PARTNERSHIP PLAYS
 
 ### 🔗 AFFILIATE PLAY #1: [TREND NAME]
 
@@ -928,11 +1151,9 @@ Revenue Projection:
   - Projected revenue: $[XXX]
 ```
 
-(Create for 3 trends with affiliate potential)
+(Create for 3 trends with affiliate potential)"""
 
----
-
-## 📰 SECTION 4: NEWS/AUTHORITY SITE PLAYS
+_INSIGHTS_SECTION_4 = """## 📰 SECTION 4: NEWS/AUTHORITY SITE PLAYS
 
 For NEWSWORTHY trends:
 
@@ -957,11 +1178,9 @@ Syndication Strategy:
   - LinkedIn article: [yes/no]
   - Guest post pitches: [target sites]
   - HARO queries to answer: [topic areas]
-```
+```"""
 
----
-
-## ⚡ SECTION 5: RAPID EXECUTION TIMELINE
+_INSIGHTS_SECTION_5 = """## ⚡ SECTION 5: RAPID EXECUTION TIMELINE
 
 ### 🔴 NEXT 2 HOURS - CRITICAL ACTIONS
 ```
@@ -993,11 +1212,9 @@ Syndication Strategy:
 □ Double down on winners
 □ Create follow-up content
 □ Build evergreen content from trending topics
-```
+```"""
 
----
-
-## ⚠️ SECTION 6: RISK ASSESSMENT & COMPLIANCE
+_INSIGHTS_SECTION_6 = """## ⚠️ SECTION 6: RISK ASSESSMENT & COMPLIANCE
 
 ### Trends Requiring Caution:
 ```
@@ -1013,11 +1230,9 @@ Syndication Strategy:
 - [Trend]: Owned by [entity] - License needed: [yes/no]
 - [Trend]: Fair use applies for [context]
 - [Trend]: Avoid using [specific terms/images]
-```
+```"""
 
----
-
-## 💎 SECTION 7: HIDDEN GEM OPPORTUNITIES
+_INSIGHTS_SECTION_7 = """## 💎 SECTION 7: HIDDEN GEM OPPORTUNITIES
 
 Lower-traffic trends with HIGH monetization potential:
 
@@ -1031,18 +1246,218 @@ First-Mover Advantage Window: [X] hours/days
 Execution Priority: [1-10]
 ```
 
-(Identify 3 hidden gems)
+(Identify 3 hidden gems)"""
+
+# Number of top-traffic trends that get a Section 1 content play
+CONTENT_PLAY_COUNT = 5
+
+# Sections 2-7: (agent name, description, section template)
+INSIGHTS_SECTIONS = [
+    ("MerchSection", "E-commerce, print-on-demand and digital product plays.", _INSIGHTS_SECTION_2),
+    ("AffiliateSection", "Affiliate and partnership plays.", _INSIGHTS_SECTION_3),
+    ("NewsSection", "News and authority site plays.", _INSIGHTS_SECTION_4),
+    ("TimelineSection", "Rapid execution timeline.", _INSIGHTS_SECTION_5),
+    ("RiskSection", "Risk assessment and compliance notes.", _INSIGHTS_SECTION_6),
+    ("HiddenGemsSection", "Lower-traffic trends with high monetization potential.", _INSIGHTS_SECTION_7),
+]
+
+
+def _content_play_callback(rank: int):
+    """Build the before_model_callback that assigns the rank-th trend to a play."""
+    def _append_content_play_trend(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        all_trends = callback_context.state.get("live_trends_data", {}).get("all_trends_flat", [])
+        top_trends = sorted(all_trends, key=_traffic_sort_key, reverse=True)[:CONTENT_PLAY_COUNT]
+        if rank > len(top_trends):
+            # Fewer trends than plays - skip the model call with an empty play
+            return LlmResponse(content=types.Content(role="model", parts=[types.Part(text="")]))
+        
+        _append_trend_data(callback_context, llm_request)
+        trend = top_trends[rank - 1]
+        llm_request.contents[-1].parts.append(types.Part(
+            text=f"YOUR TREND (CONTENT PLAY #{rank}): {trend['title']} ({trend['traffic']}) [{trend['category']}]"
+        ))
+        return None
+    return _append_content_play_trend
+
+
+content_play_agents = [
+    LlmAgent(
+        name=f"ContentPlay{rank}",
+        model=INSIGHTS_MODEL,
+        description=f"Content plan (blog, video, thread) for the #{rank} trend by traffic.",
+        instruction=f"{_INSIGHTS_ROLE}\n{_INSIGHTS_SECTION_1_HEADER}\n\n{_CONTENT_PLAY_TEMPLATE}\n\n{_INSIGHTS_CRITICAL}",
+        before_model_callback=_content_play_callback(rank),
+        output_key=f"content_play_{rank}",
+    )
+    for rank in range(1, CONTENT_PLAY_COUNT + 1)
+]
+
+
+def _make_insights_section_agent(
+    number: int, name: str, description: str, template: str
+) -> LlmAgent:
+    """Create the LLM agent that writes one playbook section."""
+    return LlmAgent(
+        name=name,
+        model=INSIGHTS_MODEL,
+        description=description,
+        instruction=f"{_INSIGHTS_ROLE}\n{template}\n\n{_INSIGHTS_CRITICAL}",
+        before_model_callback=_append_trend_data,
+        output_key=f"insights_section_{number}",
+    )
+
+
+insights_sections = [
+    _make_insights_section_agent(number, *spec)
+    for number, spec in enumerate(INSIGHTS_SECTIONS, 2)
+]
+
+# Every LLM agent that contributes to the playbook
+insights_agents = content_play_agents + insights_sections
 
----
+# Insights keyed by trends_hash and prompt version; a re-run on the same trends reuses
+# the previous playbook instead of re-running every insights LLM call
+INSIGHTS_CACHE_FILE = Path("logs") / "insights_cache.json"
+INSIGHTS_CACHE_MAX_ENTRIES = 20
+# Fingerprint of every insights prompt and model, so editing either
+# invalidates playbooks cached under the old version
+_INSIGHTS_CACHE_VERSION = hashlib.blake2b(
+    "\0".join(f"{agent.model}\0{agent.instruction}" for agent in insights_agents).encode("utf-8"),
+    digest_size=8,
+).hexdigest()
 
-*Strategic Playbook generated from live Google Trends - December 17, 2025*
-*Execute within trend lifecycle windows for maximum ROI*
 
-⚠️ CRITICAL: All trend names MUST come from the provided data. No hallucinations.""",
-    output_key="strategic_insights",
+def _insights_cache_key(trends_hash: str) -> str:
+    """Cache key for a trend set under the current prompts and models."""
+    return f"{trends_hash}:{_INSIGHTS_CACHE_VERSION}"
+
+
+def _load_insights_cache() -> dict:
+    """Load the {cache key: strategic_insights} cache, or {} if absent."""
+    try:
+        with open(INSIGHTS_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_insights(key: str, insights: str):
+    """Store insights under a cache key, keeping only the most recent entries."""
+    cache = _load_insights_cache()
+    cache.pop(key, None)
+    cache[key] = insights
+    cache = dict(list(cache.items())[-INSIGHTS_CACHE_MAX_ENTRIES:])
+    INSIGHTS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(INSIGHTS_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+
+def _skip_insights_if_cached(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Skip the insights fan-out when there are no trends or they are unchanged."""
+    if not callback_context.state.get("trends_text_list"):
+        callback_context.state["insights_skipped"] = True
+        return types.Content(
+            role="model",
+            parts=[types.Part(text="⏭️ No trends fetched - skipping insights generation")]
+        )
+    
+    cached = _load_insights_cache().get(_insights_cache_key(callback_context.state.get("trends_hash", "")))
+    if cached:
+        callback_context.state["strategic_insights"] = cached
+        callback_context.state["insights_skipped"] = True
+        return types.Content(
+            role="model",
+            parts=[types.Part(text="♻️ Trends unchanged since a previous run - reusing cached strategic insights")]
+        )
+    return None
+
+
+insights_fanout = ParallelAgent(
+    name="InsightsFanout",
+    description="Generates the content plays and playbook sections concurrently.",
+    sub_agents=insights_agents,
+    before_agent_callback=_skip_insights_if_cached,
 )
 
 
+class InsightsAssembler(BaseAgent):
+    """
+    Joins the section outputs written by InsightsFanout into the final
+    strategic playbook and stores it as 'strategic_insights'.
+    """
+    
+    name: str = "InsightsGenerator"
+    description: str = "Assembles the strategic monetization playbook from its sections."
+
+    async def _run_async_impl(
+        self, context: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        """Concatenate the section outputs in playbook order."""
+        global agent_logger
+        
+        agent_logger.log_agent_start(self.name, "Assembling playbook sections")
+        
+        state = context.session.state
+        if state.get("insights_skipped"):
+            # InsightsFanout was skipped: strategic_insights is cached or empty
+            cached = state.get("strategic_insights", "")
+            if cached:
+                agent_logger.log_agent_action(self.name, "Reusing cached playbook")
+                agent_logger.log_agent_output(self.name, cached)
+                text = cached
+            else:
+                agent_logger.log_agent_action(self.name, "Insights fan-out skipped, nothing to assemble")
+                text = "✅ No new sections to assemble"
+            agent_logger.log_agent_complete(self.name, success=True)
+            content = types.Content(role="model", parts=[types.Part(text=text)])
+            yield Event(author=self.name, content=content)
+            return
+        
+        content_plays = [
+            state.get(f"content_play_{rank}", "")
+            for rank in range(1, CONTENT_PLAY_COUNT + 1)
+        ]
+        content_plays = [play for play in content_plays if play]
+        section_1 = ""
+        if content_plays:
+            section_1 = "\n\n".join([_INSIGHTS_SECTION_1_HEADER, *content_plays])
+        
+        sections = [section_1] + [
+            state.get(f"insights_section_{number}", "")
+            for number in range(2, len(INSIGHTS_SECTIONS) + 2)
+        ]
+        missing = sum(1 for section in sections if not section)
+        if missing:
+            agent_logger.log_agent_action(self.name, f"{missing} section(s) produced no output")
+        
+        playbook = "\n\n---\n\n".join(section for section in sections if section)
+        playbook += (
+            "\n\n---\n\n"
+            f"*Strategic Playbook generated from live Google Trends - {_today()}*\n"
+            "*Execute within trend lifecycle windows for maximum ROI*"
+        )
+        context.session.state["strategic_insights"] = playbook
+        if not missing:
+            _save_insights(_insights_cache_key(state.get("trends_hash", "")), playbook)
+        
+        agent_logger.log_agent_output(self.name, playbook)
+        agent_logger.log_agent_complete(self.name, success=True)
+        
+        agent_logger.log_agent_action(
+            self.name, f"Assembled {len(sections) - missing}/{len(sections)} playbook sections"
+        )
+        
+        # Sections were printed as they finished; this is the ordered playbook
+        content = types.Content(role="model", parts=[types.Part(text=playbook)])
+        actions = EventActions(state_delta={"strategic_insights": playbook})
+        yield Event(author=self.name, content=content, actions=actions)
+
+
+insights_generator = InsightsAssembler()
+
+
 # ============================================================================
 # AGENT 5: Google Search Sources Collector
 # ============================================================================
@@ -1087,7 +1502,6 @@ class TrendSourcesCollector(BaseAgent):
         from selenium.webdriver.support.ui import WebDriverWait
         from selenium.webdriver.support import expected_conditions as EC
         import urllib.parse
-        import time
         import random
         
         urls = []
@@ -1213,8 +1627,6 @@ class TrendSourcesCollector(BaseAgent):
         )
         
         try:
-            import time
-            import re
             import random  # Import at top for all delay operations
             
             # Get trends from session state
@@ -1230,20 +1642,7 @@ class TrendSourcesCollector(BaseAgent):
             
             # Select top trends to search (limit to avoid rate limiting)
             # Sort by traffic and take top 15
-            def traffic_sort_key(t):
-                traffic = t.get("traffic", "0")
-                # Convert traffic string to numeric for sorting
-                multipliers = {"M": 1000000, "K": 1000, "B": 1000000000}
-                match = re.match(r'(\d+)([KMB])?', traffic.replace("+", "").replace(",", ""))
-                if match:
-                    num = int(match.group(1))
-                    suffix = match.group(2)
-                    if suffix:
-                        num *= multipliers.get(suffix, 1)
-                    return num
-                return 0
-            
-            sorted_trends = sorted(all_trends, key=traffic_sort_key, reverse=True)
+            sorted_trends = sorted(all_trends, key=_traffic_sort_key, reverse=True)
             top_trends = sorted_trends[:15]  # Top 15 trends
             
             print("\n" + "="*70)
@@ -1407,12 +1806,15 @@ class TrendSourcesCollector(BaseAgent):
                 context.session.state["trend_sources"] = all_sources
                 context.session.state["sources_file"] = str(output_file)
                 context.session.state["sources_json_file"] = str(json_file)
+                # Serialized size for the run metrics, computed once at write time
+                trend_sources_bytes = len(_json_dumps(all_sources))
+                context.session.state["trend_sources_bytes"] = trend_sources_bytes
                 
                 agent_logger.log_agent_output(self.name, {
                     "trends_searched": len(top_trends),
                     "total_urls": total_urls_collected,
                     "output_file": str(output_file),
-                })
+                }, size=trend_sources_bytes)
                 agent_logger.log_agent_complete(self.name, success=True)
                 
                 print(f"\n{'='*70}")
@@ -1427,7 +1829,13 @@ class TrendSourcesCollector(BaseAgent):
                     role="model",
                     parts=[types.Part(text=f"✅ Collected {total_urls_collected} source URLs for {len(top_trends)} trends. Saved to {output_file}")]
                 )
-                yield Event(author=self.name, content=content)
+                actions = EventActions(state_delta={
+                    "trend_sources": all_sources,
+                    "sources_file": str(output_file),
+                    "sources_json_file": str(json_file),
+                    "trend_sources_bytes": trend_sources_bytes,
+                })
+                yield Event(author=self.name, content=content, actions=actions)
                 
             finally:
                 # Always close the shared Selenium driver
@@ -1451,20 +1859,36 @@ class TrendSourcesCollector(BaseAgent):
 # SEQUENTIAL PIPELINE
 # ============================================================================
 
+# Categorizer and analyzer both only read trends_text_list, so they run
+# concurrently; wall-clock for this stage is max(T_cat, T_ana), not the sum.
+trends_understanding = ParallelAgent(
+    name="TrendsUnderstanding",
+    description="Categorize and analyze the live trends concurrently.",
+    sub_agents=[
+        trend_categorizer,        # Organize and categorize trends
+        trends_analyzer,          # Analyze patterns
+    ],
+)
+
 trends_pipeline = SequentialAgent(
     name="GoogleTrendsPipeline",
-    description="Live Fetch → Categorize → Analyze → Insights → Collect Sources (with full logging)",
+    description="Live Fetch → (Categorize ‖ Analyze) → (Insight Sections) → Insights → Collect Sources (with full logging)",
     sub_agents=[
         LiveTrendsFetcher(),      # Step 1: Fetch LIVE data from Google Trends
-        trend_categorizer,        # Step 2: Organize and categorize trends
-        trends_analyzer,          # Step 3: Analyze patterns
-        insights_generator,       # Step 4: Business insights
+        trends_understanding,     # Step 2: Categorize + analyze in parallel
+        insights_fanout,          # Step 3: Playbook sections in parallel
+        insights_generator,       # Step 4: Assemble business insights
         TrendSourcesCollector(),  # Step 5: Google search for news sources
     ],
 )
 
 root_agent = trends_pipeline
 
+# Names of the LLM agents whose events run_pipeline logs as agent output
+LLM_AGENTS = frozenset(
+    agent.name for agent in [trend_categorizer, trends_analyzer, *insights_agents]
+)
+
 
 # ============================================================================
 # RUNNER SETUP
@@ -1472,6 +1896,8 @@ root_agent = trends_pipeline
 
 session_service = InMemorySessionService()
 
+# Only Gemini's implicit prefix caching applies: each agent's static
+# instruction comes first and the per-run trend data is appended last
 runner = Runner(
     agent=root_agent,
     app_name=APP_NAME,
@@ -1506,12 +1932,15 @@ async def run_pipeline():
         ],
     })
     
-    await session_service.create_session(
+    session = await session_service.create_session(
         app_name=APP_NAME,
         user_id=USER_ID,
         session_id=SESSION_ID,
         state={},
     )
+    # Local view of session state, kept current from each event's state_delta
+    # instead of re-fetching the session on every agent transition
+    session_state = dict(session.state)
     
     agent_logger.log_event("session_created", {
         "app_name": APP_NAME,
@@ -1522,99 +1951,97 @@ async def run_pipeline():
     print("\n✅ Session created")
     print("📊 Logging to: logs/")
     
-    content = types.Content(
-        role="user",
-        parts=[types.Part(text="Fetch and analyze LIVE Google Trends data for Entertainment, Games, and Shopping.")]
-    )
-    
     import warnings
     warnings.filterwarnings("ignore")
     
     current_agent = ""
-    agent_outputs = {}  # Track outputs for data processing metrics
+    started_agents = set()  # Parallel agents interleave events; start each once
+    total_bytes = 0  # LLM output bytes, added to metrics once after the loop
+    # Console text goes through sys.stdout's own buffer - the same stream the
+    # logger echoes to, so ordering holds - and is flushed once per section
+    out = sys.stdout
     
     async for event in runner.run_async(
         user_id=USER_ID,
         session_id=SESSION_ID,
-        new_message=content,
+        new_message=PIPELINE_TRIGGER_CONTENT,
     ):
-        if hasattr(event, "author") and event.author and event.author != current_agent:
-            if event.author not in ["GoogleTrendsPipeline", "user"]:
+        state_delta = getattr(getattr(event, "actions", None), "state_delta", None)
+        if state_delta:
+            session_state.update(state_delta)
+        
+        # Every LLM agent runs under a ParallelAgent, so partial deltas would
+        # interleave authors; only complete events are printed
+        if getattr(event, "partial", False):
+            continue
+        
+        author = getattr(event, "author", None)
+        if author and author != current_agent:
+            if author not in {"GoogleTrendsPipeline", "user"}:
                 # Log agent transition
                 if current_agent:
                     agent_logger.log_event("agent_transition", {
                         "from": current_agent,
-                        "to": event.author,
+                        "to": author,
                     })
                 
-                current_agent = event.author
+                current_agent = author
                 
                 # Log agent start for LLM agents
-                if current_agent in ["TrendCategorizer", "TrendsAnalyzer", "InsightsGenerator"]:
+                if current_agent in LLM_AGENTS and current_agent not in started_agents:
+                    started_agents.add(current_agent)
                     agent_logger.log_agent_start(current_agent, f"LLM processing step")
                     
                     # Log the input data the LLM agent is receiving
-                    # Get the trends_text_list from session state
-                    session = await session_service.get_session(
-                        app_name=APP_NAME,
-                        user_id=USER_ID,
-                        session_id=SESSION_ID,
-                    )
-                    if session and session.state:
-                        input_data = session.state.get("trends_text_list", "")
-                        if input_data:
-                            agent_logger.log_agent_perception(
-                                current_agent,
-                                "Session State: trends_text_list",
-                                input_data
-                            )
+                    input_data = session_state.get("trends_text_list", "")
+                    if input_data:
+                        agent_logger.log_agent_perception(
+                            current_agent,
+                            "Session State: trends_text_list",
+                            input_data
+                        )
                 
-                print(f"\n{'─'*70}")
-                print(f"📍 Agent: {current_agent}")
-                print(f"{'─'*70}")
+                out.write(f"\n{'─'*70}\n📍 Agent: {current_agent}\n{'─'*70}\n")
         
-        if hasattr(event, "content") and event.content:
-            if hasattr(event.content, "parts"):
-                for part in event.content.parts:
-                    if hasattr(part, "text") and part.text:
-                        output_text = part.text
-                        output_size = len(output_text)
-                        
-                        # Log output for LLM agents with actual data size
-                        if current_agent in ["TrendCategorizer", "TrendsAnalyzer", "InsightsGenerator"]:
-                            agent_outputs[current_agent] = output_text
-                            agent_logger.log_agent_output(current_agent, output_text)
-                            agent_logger.log_agent_complete(current_agent, success=True)
-                            
-                            # Add to data processed metric
-                            agent_logger.run_data["metrics"]["total_data_bytes"] += output_size
-                        
-                        print(output_text)
+        parts = getattr(getattr(event, "content", None), "parts", None) or ()
+        for part in parts:
+            output_text = getattr(part, "text", None)
+            if not output_text:
+                continue
+            output_size = len(output_text)
+            
+            # Log output for LLM agents with actual data size
+            if current_agent in LLM_AGENTS:
+                agent_logger.log_agent_output(current_agent, output_text)
+                agent_logger.log_agent_complete(current_agent, success=True)
+                total_bytes += output_size
+            
+            # Parallel sections print in completion order, as soon as each is done
+            out.write(output_text + "\n")
+            out.flush()  # Section complete
     
-    # Log final data summary
-    session = await session_service.get_session(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-        session_id=SESSION_ID,
-    )
+    # Add LLM output to data processed metric
+    agent_logger.run_data["metrics"]["total_data_bytes"] += total_bytes
     
-    if session and session.state:
+    # Log final data summary
+    if session_state:
         # Calculate total data in session state
-        live_data = session.state.get("live_trends_data", {})
-        trends_list = session.state.get("trends_text_list", "")
-        categorized = session.state.get("categorized_trends", "")
-        analysis = session.state.get("analysis_report", "")
-        insights = session.state.get("strategic_insights", "")
-        trend_sources = session.state.get("trend_sources", {})
-        sources_file = session.state.get("sources_file", "")
+        live_data = session_state.get("live_trends_data", {})
+        live_data_bytes = session_state.get("live_trends_data_bytes", 0)
+        trends_list = session_state.get("trends_text_list", "")
+        categorized = session_state.get("categorized_trends", "")
+        analysis = session_state.get("analysis_report", "")
+        insights = session_state.get("strategic_insights", "")
+        trend_sources = session_state.get("trend_sources", {})
+        sources_file = session_state.get("sources_file", "")
         
         total_session_data = (
-            len(json.dumps(live_data, default=str)) +
+            live_data_bytes +
             len(str(trends_list)) +
             len(str(categorized)) +
             len(str(analysis)) +
             len(str(insights)) +
-            len(json.dumps(trend_sources, default=str))
+            session_state.get("trend_sources_bytes", 0)
         )
         
         agent_logger.run_data["metrics"]["total_data_bytes"] += total_session_data
@@ -1623,8 +2050,9 @@ async def run_pipeline():
         total_urls = sum(data.get("url_count", 0) for data in trend_sources.values())
         
         agent_logger.log_event("session_data_summary", {
-            "live_trends_data_size": len(json.dumps(live_data, default=str)),
+            "live_trends_data_size": live_data_bytes,
             "trends_text_list_size": len(str(trends_list)),
+            "trends_text_list_tokens": session_state.get("trends_token_count", 0),
             "total_unique_trends": live_data.get("summary", {}).get("total_unique_trends", 0),
             "sources_fetched": live_data.get("summary", {}).get("sources_fetched", 0),
             "trends_searched_for_sources": len(trend_sources),
@@ -1643,15 +2071,15 @@ async def run_pipeline():
 
 async def main():
     """Entry point."""
-    try:
-        import pytrends
-    except ImportError:
+    if pytrends is None:
         print("❌ Missing 'pytrends' package.")
         print("   Install with: pip install pytrends")
-        print("\nInstalling now...")
-        import subprocess
-        subprocess.run(["pip", "install", "pytrends"], check=True)
-        print("✅ Installed pytrends")
+        # Only shell out to pip when explicitly asked to
+        if os.environ.get("AUTO_INSTALL"):
+            print("\nInstalling now...")
+            import subprocess
+            subprocess.run(["pip", "install", "pytrends"], check=True)
+            print("✅ Installed pytrends")
     
     await run_pipeline()
 
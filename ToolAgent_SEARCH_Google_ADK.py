@@ -14,6 +14,10 @@ APP_NAME = "google_search_app"
 USER_ID = "user_123"
 SESSION_ID = "session_456"
 
+def _user_message(text: str) -> types.Content:
+    """Wrap query text as a user Content message."""
+    return types.Content(role='user', parts=[types.Part(text=text)])
+
 # --- Session Service ---
 session_service = InMemorySessionService()
 
@@ -46,7 +50,7 @@ async def call_search_agent_async(query: str):
     print("Agent: ", end="", flush=True)
     
     try:
-        content = types.Content(role='user', parts=[types.Part(text=query)])
+        content = _user_message(query)
         
         async for event in runner.run_async(
             user_id=USER_ID,